@@ -1,65 +1,31 @@
-from flask import Flask, request, jsonify
+from quart import Quart, request, jsonify
 import google.generativeai as genai
-from PyPDF2 import PdfReader
-import docx2txt
-import os
-from werkzeug.utils import secure_filename
-import json
+import io
+import orjson
+import hashlib
+import asyncio
+import logging
+from docx_reader import read_docx_text
+from common import OrjsonProvider, allowed_file, cached_parse, extract_first_json, add_batch_route
 
-app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+app.json = OrjsonProvider(app)
 
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc'}
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  
 
-# Create uploads folder if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-class ResumeParser:
-    def __init__(self, api_key):
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
-    
-    def extract_text_from_pdf(self, file_path):
-        """Extract text from PDF files"""
-        try:
-            reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text()
-            return text
-        except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
-
-    def extract_text_from_docx(self, file_path):
-        """Extract text from DOCX files"""
-        try:
-            text = docx2txt.process(file_path)
-            return text
-        except Exception as e:
-            raise Exception(f"Error extracting text from DOCX: {str(e)}")
+# Cap on concurrent LLM requests in this process. Each server worker has its own cap, so the
+# server-wide limit is LLM_CONCURRENCY times the worker count in hypercorn_conf.py.
+LLM_CONCURRENCY = 8
+_LLM_SEM = asyncio.Semaphore(LLM_CONCURRENCY)
 
-    def extract_text(self, file_path):
-        """Extract text based on file extension"""
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        if file_extension == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        elif file_extension in ['.docx', '.doc']:
-            return self.extract_text_from_docx(file_path)
-        else:
-            raise Exception(f"Unsupported file format: {file_extension}")
+MODEL_NAME = 'gemini-pro'
 
-    def parse_resume(self, text):
-        """Parse resume text using Gemini API"""
-        prompt = """
+_PROMPT = """
         Extract information from the following resume and format it as JSON with the following structure:
         {
           "profile": {
@@ -103,16 +69,47 @@ class ResumeParser:
 
         Resume text:
         """
-        
+
+class ResumeParser:
+    def __init__(self, api_key):
+        # Configure Gemini API
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(MODEL_NAME)
+    
+    def extract_text_from_pdf(self, file_data):
+        """Extract text from PDF files"""
+        try:
+            from PyPDF2 import PdfReader
+            reader = PdfReader(io.BytesIO(file_data))
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+    def extract_text_from_docx(self, file_data):
+        """Extract text from DOCX files"""
+        try:
+            return read_docx_text(io.BytesIO(file_data))
+        except Exception as e:
+            raise Exception(f"Error extracting text from DOCX: {str(e)}")
+
+    def extract_text(self, file_data, file_extension):
+        """Extract text based on file extension"""
+        if file_extension == 'pdf':
+            return self.extract_text_from_pdf(file_data)
+        elif file_extension in ['docx', 'doc']:
+            return self.extract_text_from_docx(file_data)
+        else:
+            raise Exception(f"Unsupported file format: {file_extension}")
+
+    async def parse_resume(self, text):
+        """Parse resume text using Gemini API"""
         try:
-            response = self.model.generate_content(prompt + text)
+            async with _LLM_SEM:
+                response = await self.model.generate_content_async(_PROMPT + text)
             # Extract JSON from response
             response_text = response.text
             # Find the JSON part of the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            json_str = response_text[json_start:json_end]
-            return json.loads(json_str)
+            return orjson.loads(extract_first_json(response_text))
         except Exception as e:
             raise Exception(f"Error parsing resume with Gemini API: {str(e)}")
 
@@ -122,48 +119,48 @@ if not api_key:
     raise Exception("GOOGLE_API_KEY environment variable not set")
 parser = ResumeParser(api_key)
 
+async def parse_upload(file_data, file_extension, file_hash):
+    """Parse an uploaded resume, reusing the cached result for identical files"""
+    async def parse():
+        text = await asyncio.to_thread(parser.extract_text, file_data, file_extension)
+        return await parser.parse_resume(text)
+    return await cached_parse(file_hash, MODEL_NAME, _PROMPT, parse)
+
 @app.route('/parse-resume', methods=['POST'])
-def parse_resume():
+async def parse_resume():
     """
     Endpoint to parse a resume file
     Expects a file upload with key 'resume'
     """
     try:
         # Check if a file was uploaded
-        if 'resume' not in request.files:
+        files = await request.files
+        if 'resume' not in files:
             return jsonify({'error': 'No file uploaded'}), 400
         
-        file = request.files['resume']
+        file = files['resume']
         
         # Check if a file was selected
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
         # Check if file type is allowed
-        if not allowed_file(file.filename):
+        if not allowed_file(file.filename, ALLOWED_EXTENSIONS):
             return jsonify({'error': 'File type not allowed'}), 400
         
-        # Save the file
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # Read the upload into memory; nothing is written to disk
+        file_data = file.stream.read()
+        file_extension = file.filename.rsplit('.', 1)[1].lower()
+        file_hash = hashlib.sha256(file_data).hexdigest()
         
-        try:
-            # Extract text from file
-            text = parser.extract_text(file_path)
-            
-            # Parse resume
-            parsed_data = parser.parse_resume(text)
-            
-            # Return parsed data
-            return jsonify({
-                'status': 'success',
-                'data': parsed_data
-            })
-            
-        finally:
-            # Clean up - remove uploaded file
-            os.remove(file_path)
+        # Parse resume, or return the cached result for identical uploads
+        parsed_data = await parse_upload(file_data, file_extension, file_hash)
+        
+        # Return parsed data
+        return jsonify({
+            'status': 'success',
+            'data': parsed_data
+        })
             
     except Exception as e:
         return jsonify({
@@ -171,8 +168,10 @@ def parse_resume():
             'error': str(e)
         }), 500
 
+add_batch_route(app, parse_upload, ALLOWED_EXTENSIONS)
+
 @app.route('/health', methods=['GET'])
-def health_check():
+async def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'})
 
@@ -1,129 +1,213 @@
-import pdfplumber
-from flask import Flask, request, jsonify
-import os
-from werkzeug.utils import secure_filename
-import json
-from groq import Groq
+from quart import Quart, request, jsonify
+import io
+import orjson
+import hashlib
+import asyncio
+import functools
+import threading
+from docx_reader import read_docx_text
 import logging
 import traceback
-import tiktoken
+from common import OrjsonProvider, allowed_file, cached_parse, JsonScanner, add_batch_route
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+app = Quart(__name__)
+app.json = OrjsonProvider(app)
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc'}
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def allowed_file(filename):
-    """Check if the file type is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def count_tokens(text):
-    """Estimate token count using GPT-2 tokenizer"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
+# Cap on concurrent LLM requests in this process. Each server worker has its own cap, so the
+# server-wide limit is LLM_CONCURRENCY times the worker count in hypercorn_conf.py.
+LLM_CONCURRENCY = 8
+_LLM_SEM = asyncio.Semaphore(LLM_CONCURRENCY)
+
+MODEL_NAME = "deepseek-r1-distill-llama-70b"
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    """Load the tokenizer on first use and reuse it; rebuilding it reparses the merges table."""
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
+# Schema is kept on one line: it is sent with every request, so whitespace costs tokens each time
+_PROMPT = (
+    "Extract resume information from the following text. Return a JSON object with key details:\n"
+    '{"profile":{"location":{"current":"","relocation":""},'
+    '"education":{"college":"","degree":"","stream":""},'
+    '"professionalExperience":[{"company":"","from":"","to":"","description":[""]}],'
+    '"skills":[{"skill":"","yearsOfExperience":""}]}}\n\n'
+    "Resume Text:\n"
+)
+
+@functools.lru_cache(maxsize=1)
+def prompt_token_count():
+    """Token count of the fixed prompt, computed once."""
+    return len(get_encoding().encode_ordinary(_PROMPT))
+
+# English text averages ~4 characters per token. Twice that is only a first guess for how much
+# text to tokenize: tokens for whitespace runs or long words can be longer, so truncation widens it as needed.
+PRECUT_CHARS_PER_TOKEN = 8
 
 class ResumeParser:
     def __init__(self, api_key):
-        self.client = Groq(api_key=api_key)
-        self.MAX_TOKENS = 2000  # Conservative limit for input text
+        self.api_key = api_key
+        self._client = None
+        self.MAX_TOKENS = 2000  # Conservative limit for prompt plus input text
+
+    @property
+    def client(self):
+        """Groq client, created on first use to keep worker start-up light."""
+        if self._client is None:
+            from groq import AsyncGroq
+            self._client = AsyncGroq(api_key=self.api_key)
+        return self._client
+
+    def extract_text_with_pdfplumber(self, file_data):
+        """Extract text from PDF bytes with pdfplumber."""
+        import pdfplumber
+        with pdfplumber.open(io.BytesIO(file_data)) as pdf:
+            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+    def extract_text_from_pdf(self, file_data):
+        """Extract text from PDF bytes."""
+        # PyMuPDF is much faster than pdfplumber for plain text; close explicitly to avoid leaks
+        import pymupdf
+        doc = pymupdf.open(stream=file_data, filetype="pdf")
+        try:
+            text = "\n".join(page.get_text() for page in doc)
+        finally:
+            doc.close()
+
+        if not text.strip():
+            logger.info("PyMuPDF extracted no text, falling back to pdfplumber")
+            text = self.extract_text_with_pdfplumber(file_data)
+        return text
+
+    def extract_text_from_docx(self, file_data):
+        """Extract text from DOCX bytes."""
+        return read_docx_text(io.BytesIO(file_data))
 
-    def extract_text_from_pdf(self, file_path):
-        """Extract text from a PDF file."""
+    def extract_text(self, file_data, file_extension):
+        """Extract text based on file extension."""
         try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-            
+            if file_extension == 'pdf':
+                text = self.extract_text_from_pdf(file_data)
+            elif file_extension in ['docx', 'doc']:
+                text = self.extract_text_from_docx(file_data)
+            else:
+                raise ValueError(f"Unsupported file format: {file_extension}")
+
             if not text.strip():
-                raise ValueError("No text could be extracted from the PDF.")
+                raise ValueError("No text could be extracted from the file.")
 
             return text.strip()
         except Exception as e:
-            logger.error(f"Error extracting text from PDF: {str(e)}")
+            logger.error(f"Error extracting text: {str(e)}")
             raise RuntimeError(f"Failed to extract text: {str(e)}")
 
     def clean_json_string(self, text):
-        """Clean and validate JSON string."""
+        """Parse the JSON object sliced from an LLM response."""
         try:
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start == -1 or end == 0:
-                raise ValueError("No JSON object found in response")
-            
-            json_str = text[start:end]
-            parsed = json.loads(json_str)
-            return json.dumps(parsed)
+            return orjson.loads(text)
         except Exception as e:
             logger.error(f"JSON cleaning error: {str(e)}")
             logger.error(f"Problematic text: {text}")
             raise ValueError(f"Invalid JSON structure: {str(e)}")
 
     def truncate_to_token_limit(self, text, max_tokens):
-        """Truncate text to approximate token limit"""
-        while count_tokens(text) > max_tokens:
-            text = text[:int(len(text) * 0.9)]  # Reduce by 10% each time
-        return text
+        """Truncate text to token limit"""
+        # Every token covers at least one byte, so short ASCII text can't be over the limit
+        if len(text) <= max_tokens and text.isascii():
+            return text
+
+        # Tokenize a prefix instead of the whole text, doubling it while it yields too few tokens
+        enc = get_encoding()
+        limit = max_tokens * PRECUT_CHARS_PER_TOKEN
+        while True:
+            prefix = text[:limit]
+            tokens = enc.encode_ordinary(prefix)
+            if len(tokens) > max_tokens or limit >= len(text):
+                break
+            limit *= 2
+        if len(tokens) <= max_tokens:
+            return prefix
+        return enc.decode(tokens[:max_tokens])
+
+    async def read_json_stream(self, stream):
+        """Read a streamed answer up to the end of its first JSON object and return that object's text."""
+        parts = []
+        scanner = JsonScanner()
+        # Reasoning models think inside <think>...</think> first; braces there are not the answer.
+        # Text is held in `pending` until it is known whether it belongs to that block.
+        thinking = None
+        pending = ""
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if thinking is not False:
+                    pending += delta
+                    if thinking is None:
+                        head = pending.lstrip()
+                        if len(head) < len("<think>") and "<think>".startswith(head):
+                            continue
+                        thinking = head.startswith("<think>")
+                    if thinking:
+                        end = pending.find("</think>")
+                        if end == -1:
+                            # Keep just enough of the tail to spot a closing tag split across chunks
+                            pending = pending[-(len("</think>") - 1):]
+                            continue
+                        thinking = False
+                        pending = pending[end + len("</think>"):]
+                    delta, pending = pending, ""
+                parts.append(delta)
+                end = scanner.feed(delta)
+                if end != -1:
+                    # Object is complete; no need to wait for the rest of the generation
+                    parts[-1] = delta[:end]
+                    return "".join(parts)[scanner.start:]
+        finally:
+            await stream.close()
+        logger.error(f"Problematic text: {''.join(parts)}")
+        raise ValueError("No JSON object found in response")
 
-    def parse_resume(self, file_path):
+    async def parse_resume(self, file_data, file_extension):
         """Parse resume by extracting text and sending it to the LLM."""
         try:
-            # Step 1: Extract text from PDF
-            extracted_text = self.extract_text_from_pdf(file_path)
+            # Step 1: Extract text from the PDF or DOCX
+            extracted_text = await asyncio.to_thread(self.extract_text, file_data, file_extension)
             logger.info(f"Extracted text length: {len(extracted_text)} characters")
 
             # Step 2: Truncate content to fit within token limits
-            truncated_content = self.truncate_to_token_limit(extracted_text, self.MAX_TOKENS)
+            truncated_content = self.truncate_to_token_limit(extracted_text, self.MAX_TOKENS - prompt_token_count())
             logger.info(f"Truncated text length: {len(truncated_content)} characters")
 
-            # Step 3: Prepare prompt
-            prompt = """Extract resume information from the following text. Return a JSON object with key details:
-{
-  "profile": {
-    "location": {"current": "", "relocation": ""},
-    "education": {"college": "", "degree": "", "stream": ""},
-    "professionalExperience": [
-      {
-        "company": "",
-        "from": "",
-        "to": "",
-        "description": [""]
-      }
-    ],
-    "skills": [{"skill": "", "yearsOfExperience": ""}]
-  }
-}
-
-Resume Text: """
-
             logger.info("Sending request to Groq API")
 
-            # Step 4: Send to LLM
-            completion = self.client.chat.completions.create(
-                messages=[{
-                    "role": "user",
-                    "content": f"{prompt}\n{truncated_content}"
-                }],
-                model="deepseek-r1-distill-llama-70b",
-                temperature=0.0,
-                max_tokens=4000
-            )
-
+            # Step 3: Send to LLM
+            async with _LLM_SEM:
+                stream = await self.client.chat.completions.create(
+                    messages=[{
+                        "role": "user",
+                        "content": f"{_PROMPT}{truncated_content}"
+                    }],
+                    model=MODEL_NAME,
+                    temperature=0.0,
+                    max_tokens=4000,
+                    stream=True
+                )
+                response_text = await self.read_json_stream(stream)
             logger.info("Received response from Groq API")
-            response_text = completion.choices[0].message.content
             logger.debug(f"Raw API response: {response_text[:500]}...")
 
-            # Step 5: Extract JSON response
-            clean_json = self.clean_json_string(response_text)
-            return json.loads(clean_json)
+            # Step 4: Parse JSON response
+            return self.clean_json_string(response_text)
 
         except Exception as e:
             logger.error(f"Error in parse_resume: {str(e)}")
@@ -134,43 +218,48 @@ Resume Text: """
 api_key = 'xxxx'  # Replace with your actual API key
 parser = ResumeParser(api_key)
 
+@app.before_serving
+async def warm_up():
+    """Load the tokenizer in the background so the first request doesn't pay for it."""
+    threading.Thread(target=prompt_token_count, daemon=True).start()
+
+async def parse_upload(file_data, file_extension, file_hash):
+    """Parse an uploaded resume, reusing the cached result for identical files."""
+    return await cached_parse(file_hash, MODEL_NAME, _PROMPT, lambda: parser.parse_resume(file_data, file_extension))
+
 @app.route('/parse-resume', methods=['POST'])
-def parse_resume():
+async def parse_resume():
     """API endpoint to parse resumes."""
     try:
         logger.info("Received parse-resume request")
 
-        if 'resume' not in request.files:
+        files = await request.files
+        if 'resume' not in files:
             logger.error("No file uploaded")
             return jsonify({'error': 'No file uploaded'}), 400
 
-        file = request.files['resume']
+        file = files['resume']
         logger.info(f"Received file: {file.filename}")
 
         if file.filename == '':
             logger.error("No file selected")
             return jsonify({'error': 'No file selected'}), 400
 
-        if not allowed_file(file.filename):
+        if not allowed_file(file.filename, ALLOWED_EXTENSIONS):
             logger.error(f"Invalid file type: {file.filename}")
             return jsonify({'error': f'File type not allowed. Allowed types: {ALLOWED_EXTENSIONS}'}), 400
 
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        logger.info(f"File saved to: {file_path}")
+        # Parse straight from the in-memory upload; nothing is written to disk
+        file_data = file.stream.read()
+        file_extension = file.filename.rsplit('.', 1)[1].lower()
+        file_hash = hashlib.sha256(file_data).hexdigest()
 
-        try:
-            parsed_data = parser.parse_resume(file_path)
-            logger.info("Successfully parsed resume")
-            return jsonify({
-                'status': 'success',
-                'data': parsed_data
-            })
-        finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Cleaned up file: {file_path}")
+        parsed_data = await parse_upload(file_data, file_extension, file_hash)
+        logger.info("Successfully parsed resume")
+        return jsonify({
+            'status': 'success',
+            'data': parsed_data
+        })
 
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
@@ -180,8 +269,10 @@ def parse_resume():
             'error': str(e)
         }), 500
 
+add_batch_route(app, parse_upload, ALLOWED_EXTENSIONS)
+
 @app.route('/health', methods=['GET'])
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return jsonify({'status': 'healthy'})
 
@@ -0,0 +1,214 @@
+from quart import request, jsonify
+from quart.json.provider import JSONProvider
+import os
+import orjson
+import hashlib
+import time
+import tempfile
+import contextlib
+import asyncio
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, used by jsonify and request parsing."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+# Parsed results are cached on disk, keyed by model, prompt and file content hash
+CACHE_FOLDER = 'cache'
+CACHE_TIMEOUT = 24 * 60 * 60
+# Expired entries are swept at most this often per process
+CACHE_SWEEP_INTERVAL = 60 * 60
+
+os.makedirs(CACHE_FOLDER, exist_ok=True)
+
+_last_sweep = 0.0
+
+def allowed_file(filename, allowed_extensions):
+    """Check if the file type is allowed."""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+def result_cache_key(model_name, prompt, file_hash):
+    """Cache key for a parse result; the same file parsed with another model or prompt gets its own entry."""
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+    return hashlib.sha256(f"{model_name}\n{prompt_hash}\n{file_hash}".encode()).hexdigest()
+
+def get_cached_result(cache_key):
+    """Return the cached parse result for a cache key, if still fresh."""
+    cache_path = os.path.join(CACHE_FOLDER, f"{cache_key}.json")
+    try:
+        if time.time() - os.path.getmtime(cache_path) > CACHE_TIMEOUT:
+            os.remove(cache_path)
+            return None
+        with open(cache_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def prune_cache():
+    """Remove cache entries and leftover temp files older than CACHE_TIMEOUT."""
+    cutoff = time.time() - CACHE_TIMEOUT
+    try:
+        with os.scandir(CACHE_FOLDER) as entries:
+            for entry in entries:
+                if entry.name.endswith(('.json', '.tmp')):
+                    with contextlib.suppress(OSError):
+                        if entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+    except OSError as e:
+        logger.warning(f"Could not prune cache: {str(e)}")
+
+def cache_result(cache_key, data):
+    """Store a parse result under its cache key; caching is best-effort."""
+    global _last_sweep
+    cache_path = os.path.join(CACHE_FOLDER, f"{cache_key}.json")
+    tmp_path = None
+    try:
+        # Each writer gets its own temp file, so concurrent writes of the same key can't collide
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_FOLDER, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps(data))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not cache result for {cache_key}: {str(e)}")
+        if tmp_path:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+    # Entries that are never looked up again would otherwise stay forever
+    now = time.time()
+    if now - _last_sweep > CACHE_SWEEP_INTERVAL:
+        _last_sweep = now
+        prune_cache()
+
+async def cached_parse(file_hash, model_name, prompt, parse):
+    """Return the cached result for this file, model and prompt, or await parse() and cache it."""
+    cache_key = result_cache_key(model_name, prompt, file_hash)
+    # Cache lookups and writes touch the disk, so keep them off the event loop
+    parsed_data = await asyncio.to_thread(get_cached_result, cache_key)
+    if parsed_data is not None:
+        logger.info(f"Cache hit for file hash: {file_hash}")
+        return parsed_data
+
+    parsed_data = await parse()
+    await asyncio.to_thread(cache_result, cache_key, parsed_data)
+    return parsed_data
+
+class JsonScanner:
+    """Incrementally finds the first balanced top-level JSON object in text fed in chunks."""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = -1  # Offset of the opening brace in all text fed so far
+        self.fed = 0
+
+    def feed(self, chunk):
+        """Scan the next chunk; return the index just past the closing brace in chunk, or -1 if still open."""
+        for i, char in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth:
+                self.in_string = True
+            elif char == '{':
+                if not self.depth:
+                    self.start = self.fed + i
+                self.depth += 1
+            elif char == '}' and self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    self.fed += i + 1
+                    return i + 1
+        self.fed += len(chunk)
+        return -1
+
+def extract_first_json(text):
+    """Return the first balanced top-level JSON object in text, in a single pass."""
+    scanner = JsonScanner()
+    end = scanner.feed(text)
+    if end == -1:
+        raise ValueError("No JSON object found in response")
+    return text[scanner.start:end]
+
+def add_batch_route(app, parse_upload, allowed_extensions):
+    """Register the /parse-resumes endpoint; parse_upload(file_data, file_extension, file_hash) parses one file."""
+
+    @app.route('/parse-resumes', methods=['POST'])
+    async def parse_resumes():
+        """API endpoint to parse several resumes in one request."""
+        try:
+            logger.info("Received parse-resumes request")
+
+            files = (await request.files).getlist('resumes')
+            if not files:
+                logger.error("No files uploaded")
+                return jsonify({'error': 'No files uploaded'}), 400
+
+            # Identical files share one parse; LLM fan-out is bounded by the app's semaphore
+            jobs = {}
+            entries = []
+            for file in files:
+                if not allowed_file(file.filename, allowed_extensions):
+                    entries.append((file.filename, None))
+                    continue
+                file_data = file.stream.read()
+                file_hash = hashlib.sha256(file_data).hexdigest()
+                if file_hash not in jobs:
+                    file_extension = file.filename.rsplit('.', 1)[1].lower()
+                    jobs[file_hash] = asyncio.ensure_future(parse_upload(file_data, file_extension, file_hash))
+                entries.append((file.filename, jobs[file_hash]))
+
+            await asyncio.gather(*jobs.values(), return_exceptions=True)
+
+            results = []
+            for filename, job in entries:
+                if job is None:
+                    results.append({
+                        'filename': filename,
+                        'status': 'error',
+                        'error': f'File type not allowed. Allowed types: {allowed_extensions}'
+                    })
+                elif job.exception() is not None:
+                    results.append({
+                        'filename': filename,
+                        'status': 'error',
+                        'error': str(job.exception())
+                    })
+                else:
+                    results.append({
+                        'filename': filename,
+                        'status': 'success',
+                        'data': job.result()
+                    })
+            logger.info(f"Parsed batch of {len(results)} resumes")
+            return jsonify({
+                'status': 'success',
+                'results': results
+            })
+
+        except Exception as e:
+            logger.error(f"Error processing request: {str(e)}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            return jsonify({
+                'status': 'error',
+                'error': str(e)
+            }), 500
+
+    return parse_resumes
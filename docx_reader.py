@@ -0,0 +1,40 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# WordprocessingML namespace used by the document, header and footer parts
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+HEADER_XML = re.compile(r'word/header[0-9]*\.xml')
+DOCUMENT_XML = 'word/document.xml'
+FOOTER_XML = re.compile(r'word/footer[0-9]*\.xml')
+
+def xml_part_text(part):
+    """Collect the text runs of one WordprocessingML part."""
+    parts = []
+    for _, elem in ET.iterparse(part):
+        if elem.tag == W_NS + 't':
+            parts.append(elem.text or "")
+        elif elem.tag == W_NS + 'tab':
+            parts.append("\t")
+        elif elem.tag in (W_NS + 'br', W_NS + 'cr'):
+            parts.append("\n")
+        elif elem.tag == W_NS + 'p':
+            parts.append("\n")
+            elem.clear()
+    return "".join(parts)
+
+def read_docx_text(file):
+    """Read the text of a DOCX (path or file object): headers, body, then footers, as docx2txt did."""
+    with zipfile.ZipFile(file) as docx:
+        names = docx.namelist()
+        # Resume templates often keep name and contact details in the page header
+        part_names = [name for name in names if HEADER_XML.fullmatch(name)]
+        part_names.append(DOCUMENT_XML)
+        part_names += [name for name in names if FOOTER_XML.fullmatch(name)]
+
+        texts = []
+        for name in part_names:
+            with docx.open(name) as part:
+                texts.append(xml_part_text(part))
+    return "".join(texts)
@@ -0,0 +1,13 @@
+import os
+
+# Production server settings, e.g. `hypercorn --config file:hypercorn_conf.py app3:app`
+bind = ["0.0.0.0:8000"]
+
+# Async workers overlap LLM I/O within a process, so one worker per core is enough
+# to spread CPU-bound text extraction across cores
+workers = os.cpu_count() or 1
+worker_class = "asyncio"
+
+# LLM calls are slow; keep idle connections and shutdowns generous
+keep_alive_timeout = 120
+graceful_timeout = 120